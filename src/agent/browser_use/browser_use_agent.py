@@ -1,24 +1,34 @@
 from __future__ import annotations
 
 import asyncio
+import copy
 import logging
 import os
+from functools import lru_cache
 
 # from lmnr.sdk.decorators import observe
 from browser_use.agent.gif import create_history_gif
 from browser_use.agent.service import Agent, AgentHookFunc
 from browser_use.agent.views import (
+    ActionModel,
     ActionResult,
     AgentHistory,
     AgentHistoryList,
+    AgentOutput,
     AgentStepInfo,
+    MessageManagerState,
     ToolCallingMethod,
 )
 from browser_use.browser.views import BrowserStateHistory
 from browser_use.utils import time_execution_async
 from dotenv import load_dotenv
+from pydantic import BaseModel
 from browser_use.agent.message_manager.utils import is_model_without_tool_support
 
+from src.agent.browser_use.custom_message_manager import CustomMessageManager
+from src.agent.browser_use.custom_prompts import CustomSystemPrompt
+from src.utils.llm_provider import supports_cache_control
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -27,7 +37,73 @@ SKIP_LLM_API_KEY_VERIFICATION = (
 )
 
 
+def _cache_json_schema(model: type[BaseModel]) -> type[BaseModel]:
+    """
+    Memoize `model_json_schema` on a generated output model.
+    LangChain regenerates the schema on every `with_structured_output` call, i.e. on every step; the models are
+    immutable once built, so generate it once and hand out copies, as callers are free to edit the result.
+    """
+    generate = model.model_json_schema
+    schemas = {}
+
+    def model_json_schema(cls, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        if key not in schemas:
+            schemas[key] = generate(*args, **kwargs)
+        return copy.deepcopy(schemas[key])
+
+    model.model_json_schema = classmethod(model_json_schema)
+    return model
+
+
+@lru_cache(maxsize=32)
+def _agent_output_model(action_model: type[ActionModel]) -> type[AgentOutput]:
+    """Output model for an action model, with its JSON schema generated once"""
+    return _cache_json_schema(AgentOutput.type_with_custom_actions(action_model))
+
+
 class BrowserUseAgent(Agent):
+    def __init__(self, *args, screenshot_keyframe_every: int = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.screenshot_keyframe_every = screenshot_keyframe_every
+        self._setup_message_manager(injected_state=kwargs.get("injected_agent_state") is not None)
+
+    def _setup_message_manager(self, injected_state: bool = False) -> None:
+        """Rebuild the message manager around the custom system prompt"""
+        if not injected_state:
+            # drop the history seeded with the default system prompt so it is re-initialized with ours
+            self.state.message_manager_state = MessageManagerState()
+        use_cache_control = supports_cache_control(self.llm)
+        system_prompt = CustomSystemPrompt(
+            action_description=self.unfiltered_actions,
+            max_actions_per_step=self.settings.max_actions_per_step,
+            override_system_message=self.settings.override_system_message,
+            extend_system_message=self.settings.extend_system_message,
+            use_cache_control=use_cache_control,
+        )
+        self._message_manager = CustomMessageManager(
+            task=self.task,
+            system_message=system_prompt.get_system_message(),
+            settings=self._message_manager.settings,
+            state=self.state.message_manager_state,
+            use_cache_control=use_cache_control,
+            screenshot_keyframe_every=self.screenshot_keyframe_every,
+        )
+        if self.memory:
+            self.memory.message_manager = self._message_manager
+
+    async def _update_action_models_for_page(self, page) -> None:
+        """
+        Update action models with page-specific actions.
+        The controller's registry hands back the same action models while the page's actions do not change
+        (see `CustomRegistry.create_action_model`), and the output models, with their JSON schema, are kept per
+        action model.
+        """
+        self.ActionModel = self.controller.registry.create_action_model(page=page)
+        self.AgentOutput = _agent_output_model(self.ActionModel)
+        self.DoneActionModel = self.controller.registry.create_action_model(include_actions=["done"], page=page)
+        self.DoneAgentOutput = _agent_output_model(self.DoneActionModel)
+
     def _set_tool_calling_method(self) -> ToolCallingMethod | None:
         tool_calling_method = self.settings.tool_calling_method
         if tool_calling_method == 'auto':
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import logging
+
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.views import ActionResult, AgentStepInfo, MessageManagerState
+from browser_use.browser.views import BrowserState
+from browser_use.utils import time_execution_sync
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.agent.browser_use.custom_prompts import CustomAgentMessagePrompt, _wrap_cacheable
+
+logger = logging.getLogger(__name__)
+
+
+class CustomMessageManager(MessageManager):
+    def __init__(
+            self,
+            task: str,
+            system_message: SystemMessage,
+            settings: MessageManagerSettings = MessageManagerSettings(),
+            state: MessageManagerState = MessageManagerState(),
+            use_cache_control: bool = False,
+            screenshot_keyframe_every: int = 1,
+            screenshot_thumbnail_width: int = 512,
+    ):
+        self.use_cache_control = use_cache_control
+        # send the full screenshot only every n-th step and a downscaled one in between; 1 keeps full frames
+        self.screenshot_keyframe_every = screenshot_keyframe_every
+        self.screenshot_thumbnail_width = screenshot_thumbnail_width
+        super().__init__(task=task, system_message=system_message, settings=settings, state=state)
+
+    def _init_messages(self) -> None:
+        super()._init_messages()
+        if not self.use_cache_control:
+            return
+        # System prompt, context and task never change during a run: put a cache breakpoint on the task message
+        # so the whole static prefix is served from the provider's prompt cache.
+        for managed_message in self.state.history.messages:
+            message = managed_message.message
+            if (
+                    isinstance(message, HumanMessage)
+                    and isinstance(message.content, str)
+                    and message.content.startswith("Your ultimate task is")
+            ):
+                message.content = _wrap_cacheable(message.content, self.use_cache_control)
+                break
+
+    @time_execution_sync("--add_state_message")
+    def add_state_message(
+            self,
+            state: BrowserState,
+            result: list[ActionResult] | None = None,
+            step_info: AgentStepInfo | None = None,
+            use_vision=True,
+    ) -> None:
+        """Add browser state as human message"""
+
+        # if keep in memory, add to directly to history and add state without result
+        if result:
+            for r in result:
+                if r.include_in_memory:
+                    if r.extracted_content:
+                        msg = HumanMessage(content="Action result: " + str(r.extracted_content))
+                        self._add_message_with_tokens(msg)
+                    if r.error:
+                        # if endswith \n, remove it
+                        if r.error.endswith("\n"):
+                            r.error = r.error[:-1]
+                        # get only last line of error
+                        last_line = r.error.rpartition("\n")[2]
+                        msg = HumanMessage(content="Action error: " + last_line)
+                        self._add_message_with_tokens(msg)
+                    result = None  # if result in history, we dont want to add it again
+
+        is_keyframe = (
+                self.screenshot_keyframe_every <= 1
+                or step_info is None
+                or step_info.step_number % self.screenshot_keyframe_every == 0
+        )
+
+        # otherwise add state message and result to next message (which will not stay in memory)
+        state_message = CustomAgentMessagePrompt(
+            state,
+            result,
+            include_attributes=self.settings.include_attributes,
+            step_info=step_info,
+            screenshot_max_width=None if is_keyframe else self.screenshot_thumbnail_width,
+        ).get_user_message(use_vision)
+        self._add_message_with_tokens(state_message)
@@ -0,0 +1,189 @@
+import base64
+import importlib.resources
+import io
+import logging
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Union
+
+from browser_use.agent.prompts import AgentMessagePrompt, SystemPrompt
+from browser_use.agent.views import ActionResult, AgentStepInfo
+from browser_use.browser.views import BrowserState
+from langchain_core.messages import HumanMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+# The rules template shipped with browser-use. It is identical for every agent, so read it once at import time.
+# Nothing volatile (e.g. the current time) lives in here: the date is part of the per-step state message,
+# which keeps the whole system prompt a byte-identical prefix that providers can serve from their prompt cache.
+_STATIC_SYSTEM_PROMPT = importlib.resources.files("browser_use.agent").joinpath("system_prompt.md").read_text(
+    encoding="utf-8")
+
+# Leading part of every state message, identical on each step
+_STATE_HEADER = """
+[Task history memory ends]
+[Current state starts here]
+The following is one-time information - if you need to remember it write it to memory:
+"""
+
+# `max_actions` is the only placeholder of the template: split around it once and unescape the literal braces,
+# so rendering is a plain concatenation instead of a `str.format` pass over the whole text.
+_SYSTEM_PROMPT_HEAD, _SYSTEM_PROMPT_TAIL = (
+    part.replace("{{", "{").replace("}}", "}") for part in _STATIC_SYSTEM_PROMPT.split("{max_actions}", 1)
+)
+
+
+@lru_cache(maxsize=8)
+def _render_system_prompt(max_actions: int) -> str:
+    """Render the rules template; `max_actions` is its only variable, so every agent shares the same string."""
+    return f"{_SYSTEM_PROMPT_HEAD}{max_actions}{_SYSTEM_PROMPT_TAIL}"
+
+
+def _wrap_cacheable(text: str, use_cache_control: bool) -> Union[str, list[dict]]:
+    """Return `text` as a content block marked as an ephemeral cache breakpoint, or unchanged if caching is off."""
+    if not use_cache_control:
+        return text
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+@lru_cache(maxsize=4)
+def _format_minute(ts_minute: int) -> str:
+    """Format a timestamp given in whole minutes; the prompt clock only has minute resolution."""
+    return datetime.fromtimestamp(ts_minute * 60).strftime("%Y-%m-%d %H:%M")
+
+
+def _decorate_elements(elements_text: str, pixels_above: Optional[int], pixels_below: Optional[int]) -> str:
+    """Frame the element listing with the scroll hints (or page start/end markers) in a single join."""
+    if not elements_text:
+        return "empty page"
+    if (pixels_above or 0) > 0:
+        head = f"... {pixels_above} pixels above - scroll or extract content to see more ...\n"
+    else:
+        head = "[Start of page]\n"
+    if (pixels_below or 0) > 0:
+        tail = f"\n... {pixels_below} pixels below - scroll or extract content to see more ..."
+    else:
+        tail = "\n[End of page]"
+    return "".join((head, elements_text, tail))
+
+
+@lru_cache(maxsize=2)
+def _screenshot_thumbnail(screenshot: str, max_width: int) -> str:
+    """Downscale a base64 PNG screenshot to at most `max_width` pixels wide, keeping the aspect ratio."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(base64.b64decode(screenshot)))
+    if image.width <= max_width:
+        return screenshot
+    size = (max_width, round(image.height * max_width / image.width))
+    buffer = io.BytesIO()
+    image.resize(size, Image.Resampling.LANCZOS).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@lru_cache(maxsize=2)
+def _screenshot_data_url(screenshot: str) -> str:
+    """
+    Data URL of a base64 screenshot.
+    Keyed on the screenshot text, so a page that did not change between steps (waits, failed actions) reuses the
+    previous URL object instead of copying the whole image again; `str` caches its own hash, so repeated lookups
+    for the same state are free.
+    """
+    return f"data:image/png;base64,{screenshot}"
+
+
+class CustomSystemPrompt(SystemPrompt):
+    def __init__(
+            self,
+            action_description: str,
+            max_actions_per_step: int = 10,
+            override_system_message: Optional[str] = None,
+            extend_system_message: Optional[str] = None,
+            use_cache_control: bool = False,
+    ):
+        self.default_action_description = action_description
+        self.max_actions_per_step = max_actions_per_step
+        self.use_cache_control = use_cache_control
+        if override_system_message:
+            prompt = override_system_message
+        else:
+            prompt = _render_system_prompt(self.max_actions_per_step)
+
+        if extend_system_message:
+            prompt += f"\n{extend_system_message}"
+        self.system_message = SystemMessage(content=prompt)
+
+    def get_system_message(self) -> SystemMessage:
+        """
+        Get the system prompt for the agent.
+        With `use_cache_control` the prompt is emitted as a content block marked as an ephemeral cache breakpoint,
+        so Anthropic/Bedrock serve it from the prompt cache after the first step.
+        A new message is returned on each call, as the message manager may rewrite message contents in place.
+        """
+        return SystemMessage(content=_wrap_cacheable(self.system_message.content, self.use_cache_control))
+
+
+class CustomAgentMessagePrompt(AgentMessagePrompt):
+    def __init__(
+            self,
+            state: BrowserState,
+            result: Optional[list[ActionResult]] = None,
+            include_attributes: Optional[list[str]] = None,
+            step_info: Optional[AgentStepInfo] = None,
+            screenshot_max_width: Optional[int] = None,
+    ):
+        super().__init__(state, result=result, include_attributes=include_attributes, step_info=step_info)
+        self.screenshot_max_width = screenshot_max_width
+
+    def get_user_message(self, use_vision: bool = True) -> HumanMessage:
+        elements_text = _decorate_elements(
+            self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes),
+            self.state.pixels_above,
+            self.state.pixels_below,
+        )
+
+        if self.step_info:
+            step_info_description = f"Current step: {self.step_info.step_number + 1}/{self.step_info.max_steps}\n"
+        else:
+            step_info_description = ""
+        time_str = _format_minute(int(time.time()) // 60)
+        step_info_description += f"Current date and time: {time_str}"
+
+        # collect the pieces and join once instead of re-copying the growing string on every `+=`
+        parts = [
+            _STATE_HEADER,
+            f"Interactive elements from top layer of the current page inside the viewport:\n{elements_text}\n",
+            f"Current url: {self.state.url}\n",
+            f"Available tabs:\n{self.state.tabs}\n",
+            f"{step_info_description}\n",
+        ]
+
+        if self.result:
+            n_results = len(self.result)
+            for i, result in enumerate(self.result, start=1):
+                if result.extracted_content:
+                    parts.append(f"\nAction result {i}/{n_results}: {result.extracted_content}")
+                if result.error:
+                    # only use last line of error; rpartition avoids splitting the whole traceback into a list
+                    error = result.error.rpartition("\n")[2]
+                    parts.append(f"\nAction error {i}/{n_results}: ...{error}")
+
+        state_description = "".join(parts)
+
+        if self.state.screenshot and use_vision is True:
+            # Format message for vision model; the data URL is only built when the model will actually see it
+            screenshot = self.state.screenshot
+            if self.screenshot_max_width:
+                screenshot = _screenshot_thumbnail(screenshot, self.screenshot_max_width)
+            return HumanMessage(
+                content=[
+                    {"type": "text", "text": state_description},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": _screenshot_data_url(screenshot)},  # , 'detail': 'low'
+                    },
+                ]
+            )
+
+        return HumanMessage(content=state_description)
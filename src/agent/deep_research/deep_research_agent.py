@@ -2,11 +2,13 @@ import asyncio
 import json
 import logging
 import os
+import textwrap
 import threading
 import uuid
 from pathlib import Path
 from typing import Any, Dict, List, Optional, TypedDict
 
+import orjson
 from browser_use.browser.browser import BrowserConfig
 from langchain_community.tools.file_management import (
     ListDirectoryTool,
@@ -32,8 +34,10 @@ from pydantic import BaseModel, Field
 from browser_use.browser.context import BrowserContextConfig
 
 from src.agent.browser_use.browser_use_agent import BrowserUseAgent
+from src.agent.browser_use.custom_prompts import _wrap_cacheable
 from src.browser.custom_browser import CustomBrowser
 from src.controller.custom_controller import CustomController
+from src.utils.llm_provider import supports_cache_control
 from src.utils.mcp_client import setup_mcp_client_and_tools
 
 logger = logging.getLogger(__name__)
@@ -46,6 +50,112 @@ SEARCH_INFO_FILENAME = "search_info.json"
 _AGENT_STOP_FLAGS = {}
 _BROWSER_AGENT_INSTANCES = {}
 
+# Static prompts, built once and shared by every run.
+# Templates are dedented at import time: the source indentation is only noise to the model and costs tokens.
+_BROWSER_TASK_PROMPT = textwrap.dedent(
+    """
+    Research Task: {task_query}
+    Objective: Find relevant information answering the query.
+    Output Requirements: For each relevant piece of information found, please provide:
+    1. A concise summary of the information.
+    2. The title of the source page or document.
+    3. The URL of the source.
+    Focus on accuracy and relevance. Avoid irrelevant details.
+    PDF cannot directly extract _content, please try to download first, then using read_file, if you can't save or read, please try other methods.
+    """
+).strip()
+
+# Removed citation part for simplicity for now, as browser agent returns summaries.
+_SYNTHESIS_SYSTEM_PROMPT = textwrap.dedent(
+    """
+    You are a professional researcher tasked with writing a comprehensive and well-structured report based on collected findings.
+    The report should address the research topic thoroughly, synthesizing the information gathered from various sources.
+    Structure the report logically:
+    1.  Briefly introduce the topic and the report's scope (mentioning the research plan followed, including categories and tasks, is good).
+    2.  Discuss the key findings, organizing them thematically, possibly aligning with the research categories. Analyze, compare, and contrast information.
+    3.  Summarize the main points and offer concluding thoughts.
+
+    Ensure the tone is objective and professional.
+    If findings are contradictory or incomplete, acknowledge this.
+    """
+).strip()
+
+# A real template rather than an f-string: the findings are filled in by `format_prompt`, so braces inside
+# collected page content can no longer be mistaken for template variables.
+_SYNTHESIS_HUMAN_PROMPT = textwrap.dedent(
+    """
+    **Research Topic:** {topic}
+
+    {plan_summary}
+
+    **Collected Findings:**
+    ```
+    {formatted_results}
+    ```
+
+    Please generate the final research report in Markdown format based **only** on the information above.
+    """
+).strip()
+
+_SYNTHESIS_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", _SYNTHESIS_SYSTEM_PROMPT),
+        ("human", _SYNTHESIS_HUMAN_PROMPT),
+    ]
+)
+
+# `topic` is the only variable of the planning prompt: keep the template as a constant and substitute per run
+_PLANNING_PROMPT = """You are a meticulous research assistant. Your goal is to create a hierarchical research plan to thoroughly investigate the topic: "{topic}".
+The plan should be structured into several main research categories. Each category should contain a list of specific, actionable research tasks or questions.
+Format the output as a JSON list of objects. Each object represents a research category and should have:
+1. "category_name": A string for the name of the research category.
+2. "tasks": A list of strings, where each string is a specific research task for that category.
+
+Example JSON Output:
+[
+  {{
+    "category_name": "Understanding Core Concepts and Definitions",
+    "tasks": [
+      "Define the primary terminology associated with '{topic}'.",
+      "Identify the fundamental principles and theories underpinning '{topic}'."
+    ]
+  }},
+  {{
+    "category_name": "Historical Development and Key Milestones",
+    "tasks": [
+      "Trace the historical evolution of '{topic}'.",
+      "Identify key figures, events, or breakthroughs in the development of '{topic}'."
+    ]
+  }},
+  {{
+    "category_name": "Current State-of-the-Art and Applications",
+    "tasks": [
+      "Analyze the current advancements and prominent applications of '{topic}'.",
+      "Investigate ongoing research and active areas of development related to '{topic}'."
+    ]
+  }},
+  {{
+    "category_name": "Challenges, Limitations, and Future Outlook",
+    "tasks": [
+      "Identify the major challenges and limitations currently facing '{topic}'.",
+      "Explore potential future trends, ethical considerations, and societal impacts of '{topic}'."
+    ]
+  }}
+]
+
+Generate a plan with 3-10 categories, and 2-6 tasks per category for the topic: "{topic}" according to the complexity of the topic.
+Ensure the output is a valid JSON array.
+"""
+
+_PLANNING_SYSTEM_MESSAGE = SystemMessage(content="You are a research planning assistant outputting JSON.")
+_EXECUTION_SYSTEM_PROMPT = (
+    "You are a research assistant executing one task of a research plan. Focus on the current task only."
+)
+_EXECUTION_SYSTEM_MESSAGE = SystemMessage(content=_EXECUTION_SYSTEM_PROMPT)
+# Same prompt marked as a cache breakpoint for Anthropic/Bedrock: the execution history only ever grows behind it,
+# so the tool definitions and system prompt are served from the prompt cache on every later task.
+_EXECUTION_SYSTEM_MESSAGE_CACHED = SystemMessage(content=_wrap_cacheable(_EXECUTION_SYSTEM_PROMPT, True))
+
 
 async def run_single_browser_task(
         task_query: str,
@@ -79,6 +189,7 @@ async def run_single_browser_task(
 
     bu_browser = None
     bu_browser_context = None
+    task_key = None
     try:
         logger.info(f"Starting browser task for query: {task_query}")
         extra_args = []
@@ -119,16 +230,7 @@ async def run_single_browser_task(
 
         # Construct the task prompt for BrowserUseAgent
         # Instruct it to find specific info and return title/URL
-        bu_task_prompt = f"""
-        Research Task: {task_query}
-        Objective: Find relevant information answering the query.
-        Output Requirements: For each relevant piece of information found, please provide:
-        1. A concise summary of the information.
-        2. The title of the source page or document.
-        3. The URL of the source.
-        Focus on accuracy and relevance. Avoid irrelevant details.
-        PDF cannot directly extract _content, please try to download first, then using read_file, if you can't save or read, please try other methods.
-        """
+        bu_task_prompt = _BROWSER_TASK_PROMPT.format(task_query=task_query)
 
         bu_agent_instance = BrowserUseAgent(
             task=bu_task_prompt,
@@ -165,7 +267,8 @@ async def run_single_browser_task(
             logger.info(f"Browser task for '{task_query}' stopped during execution.")
             return {"query": task_query, "result": final_data, "status": "stopped"}
         else:
-            logger.info(f"Browser result for '{task_query}': {final_data}")
+            # lazy %-formatting: the result text is only copied into the log line when INFO is enabled
+            logger.info("Browser result for '%s': %s", task_query, final_data)
             return {"query": task_query, "result": final_data, "status": "completed"}
 
     except Exception as e:
@@ -189,8 +292,8 @@ async def run_single_browser_task(
             except Exception as e:
                 logger.error(f"Error closing browser: {e}")
 
-        if task_key in _BROWSER_AGENT_INSTANCES:
-            del _BROWSER_AGENT_INSTANCES[task_key]
+        if task_key is not None:
+            _BROWSER_AGENT_INSTANCES.pop(task_key, None)
 
 
 class BrowserSearchInput(BaseModel):
@@ -407,8 +510,8 @@ def _load_previous_state(task_id: str, output_dir: str) -> Dict[str, Any]:
 
     if os.path.exists(search_file):
         try:
-            with open(search_file, "r", encoding="utf-8") as f:
-                state_updates["search_results"] = json.load(f)
+            with open(search_file, "rb") as f:
+                state_updates["search_results"] = orjson.loads(f.read())
                 logger.info(f"Loaded search results from {search_file}")
         except Exception as e:
             logger.error(f"Failed to load search results {search_file}: {e}")
@@ -440,8 +543,9 @@ def _save_search_results_to_json(results: List[Dict[str, Any]], output_dir: str)
     search_file = os.path.join(output_dir, SEARCH_INFO_FILENAME)
     try:
         # Simple overwrite for now, could be append
-        with open(search_file, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        # rewritten after every task: orjson serializes the growing result list several times faster than json
+        with open(search_file, "wb") as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
         logger.info(f"Search results saved to {search_file}")
     except Exception as e:
         logger.error(f"Failed to save search results to {search_file}: {e}")
@@ -478,49 +582,9 @@ async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
 
     logger.info(f"Generating new research plan for topic: {topic}")
 
-    prompt_text = f"""You are a meticulous research assistant. Your goal is to create a hierarchical research plan to thoroughly investigate the topic: "{topic}".
-The plan should be structured into several main research categories. Each category should contain a list of specific, actionable research tasks or questions.
-Format the output as a JSON list of objects. Each object represents a research category and should have:
-1. "category_name": A string for the name of the research category.
-2. "tasks": A list of strings, where each string is a specific research task for that category.
-
-Example JSON Output:
-[
-  {{
-    "category_name": "Understanding Core Concepts and Definitions",
-    "tasks": [
-      "Define the primary terminology associated with '{topic}'.",
-      "Identify the fundamental principles and theories underpinning '{topic}'."
-    ]
-  }},
-  {{
-    "category_name": "Historical Development and Key Milestones",
-    "tasks": [
-      "Trace the historical evolution of '{topic}'.",
-      "Identify key figures, events, or breakthroughs in the development of '{topic}'."
-    ]
-  }},
-  {{
-    "category_name": "Current State-of-the-Art and Applications",
-    "tasks": [
-      "Analyze the current advancements and prominent applications of '{topic}'.",
-      "Investigate ongoing research and active areas of development related to '{topic}'."
-    ]
-  }},
-  {{
-    "category_name": "Challenges, Limitations, and Future Outlook",
-    "tasks": [
-      "Identify the major challenges and limitations currently facing '{topic}'.",
-      "Explore potential future trends, ethical considerations, and societal impacts of '{topic}'."
-    ]
-  }}
-]
-
-Generate a plan with 3-10 categories, and 2-6 tasks per category for the topic: "{topic}" according to the complexity of the topic.
-Ensure the output is a valid JSON array.
-"""
+    prompt_text = _PLANNING_PROMPT.format(topic=topic)
     messages = [
-        SystemMessage(content="You are a research planning assistant outputting JSON."),
+        _PLANNING_SYSTEM_MESSAGE,
         HumanMessage(content=prompt_text)
     ]
 
@@ -533,7 +597,7 @@ Ensure the output is a valid JSON array.
         elif raw_content.strip().startswith("```"):
             raw_content = raw_content.strip()[3:-3].strip()
 
-        logger.debug(f"LLM response for plan: {raw_content}")
+        logger.debug("LLM response for plan: %s", raw_content)
         parsed_plan_from_llm = json.loads(raw_content)
 
         new_plan: List[ResearchCategoryItem] = []
@@ -675,10 +739,8 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
         HumanMessage(content=task_prompt_content)
     ]
     if not state["messages"]:  # First actual execution message
-        invocation_messages = [
-                                  SystemMessage(
-                                      content="You are a research assistant executing one task of a research plan. Focus on the current task only."),
-                              ] + current_task_message_history
+        system_message = _EXECUTION_SYSTEM_MESSAGE_CACHED if supports_cache_control(llm) else _EXECUTION_SYSTEM_MESSAGE
+        invocation_messages = [system_message] + current_task_message_history
     else:
         invocation_messages = state["messages"] + current_task_message_history
 
@@ -734,13 +796,16 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
                     if tool_name == "parallel_browser_search":
                         current_search_results.extend(tool_output)  # tool_output is List[Dict]
                     else:  # For other tools, we might need specific handling or just log
-                        logger.info(f"Result from tool '{tool_name}': {str(tool_output)[:200]}...")
+                        if logger.isEnabledFor(logging.INFO):
+                            # str() of a tool output can be large, only build it when it is actually logged
+                            logger.info(f"Result from tool '{tool_name}': {str(tool_output)[:200]}...")
                         # Storing non-browser results might need a different structure or key in search_results
                         current_search_results.append(
                             {"tool_name": tool_name, "args": tool_args, "output": str(tool_output),
                              "status": "completed"})
 
-                    tool_results.append(ToolMessage(content=json.dumps(tool_output), tool_call_id=tool_call_id))
+                    tool_content = orjson.dumps(tool_output, option=orjson.OPT_NON_STR_KEYS).decode()
+                    tool_results.append(ToolMessage(content=tool_content, tool_call_id=tool_call_id))
 
                 except Exception as e:
                     logger.error(f"Error executing tool '{tool_name}': {e}", exc_info=True)
@@ -833,7 +898,8 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
 
     # Prepare context for the LLM
     # Format search results nicely, maybe group by query or original plan step
-    formatted_results = ""
+    # collect the pieces and join once: the findings can be long, and `+=` re-copies the whole text every time
+    formatted_parts = []
     references = {}
     ref_count = 1
     for i, result_entry in enumerate(search_results):
@@ -845,66 +911,35 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
 
         if tool_name == "parallel_browser_search" and status == "completed" and result_data:
             # result_data is the summary from BrowserUseAgent
-            formatted_results += f'### Finding from Web Search Query: "{query}"\n'
-            formatted_results += f"- **Summary:**\n{result_data}\n"  # result_data is already a summary string here
+            formatted_parts.append(f'### Finding from Web Search Query: "{query}"\n')
+            formatted_parts.append(f"- **Summary:**\n{result_data}\n")  # result_data is already a summary string here
             # If result_data contained title/URL, you'd format them here.
             # The current BrowserUseAgent returns a string summary directly as 'final_data' in run_single_browser_task
-            formatted_results += "---\n"
+            formatted_parts.append("---\n")
         elif tool_name != "parallel_browser_search" and status == "completed" and tool_output_str:
-            formatted_results += f'### Finding from Tool: "{tool_name}" (Args: {result_entry.get("args")})\n'
-            formatted_results += f"- **Output:**\n{tool_output_str}\n"
-            formatted_results += "---\n"
+            formatted_parts.append(f'### Finding from Tool: "{tool_name}" (Args: {result_entry.get("args")})\n')
+            formatted_parts.append(f"- **Output:**\n{tool_output_str}\n")
+            formatted_parts.append("---\n")
         elif status == "failed":
             error = result_entry.get("error")
             q_or_t = f"Query: \"{query}\"" if query != "Unknown Query" else f"Tool: \"{tool_name}\""
-            formatted_results += f'### Failed {q_or_t}\n'
-            formatted_results += f"- **Error:** {error}\n"
-            formatted_results += "---\n"
+            formatted_parts.append(f'### Failed {q_or_t}\n')
+            formatted_parts.append(f"- **Error:** {error}\n")
+            formatted_parts.append("---\n")
+    formatted_results = "".join(formatted_parts)
 
     # Prepare the research plan context
-    plan_summary = "\nResearch Plan Followed:\n"
+    plan_parts = ["\nResearch Plan Followed:\n"]
     for cat_idx, category in enumerate(plan):
-        plan_summary += f"\n#### Category {cat_idx + 1}: {category['category_name']}\n"
+        plan_parts.append(f"\n#### Category {cat_idx + 1}: {category['category_name']}\n")
         for task_idx, task in enumerate(category['tasks']):
             marker = "[x]" if task["status"] == "completed" else "[ ]" if task["status"] == "pending" else "[-]"
-            plan_summary += f"  - {marker} {task['task_description']}\n"
-
-    synthesis_prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                """You are a professional researcher tasked with writing a comprehensive and well-structured report based on collected findings.
-        The report should address the research topic thoroughly, synthesizing the information gathered from various sources.
-        Structure the report logically:
-        1.  Briefly introduce the topic and the report's scope (mentioning the research plan followed, including categories and tasks, is good).
-        2.  Discuss the key findings, organizing them thematically, possibly aligning with the research categories. Analyze, compare, and contrast information.
-        3.  Summarize the main points and offer concluding thoughts.
-
-        Ensure the tone is objective and professional.
-        If findings are contradictory or incomplete, acknowledge this.
-        """,  # Removed citation part for simplicity for now, as browser agent returns summaries.
-            ),
-            (
-                "human",
-                f"""
-            **Research Topic:** {topic}
-
-            {plan_summary}
-
-            **Collected Findings:**
-            ```
-            {formatted_results}
-            ```
-
-            Please generate the final research report in Markdown format based **only** on the information above.
-            """,
-            ),
-        ]
-    )
+            plan_parts.append(f"  - {marker} {task['task_description']}\n")
+    plan_summary = "".join(plan_parts)
 
     try:
         response = await llm.ainvoke(
-            synthesis_prompt.format_prompt(
+            _SYNTHESIS_PROMPT.format_prompt(
                 topic=topic,
                 plan_summary=plan_summary,
                 formatted_results=formatted_results,
@@ -914,13 +949,11 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
 
         # Append the reference list automatically to the end of the generated markdown
         if references:
-            report_references_section = "\n\n## References\n\n"
             # Sort refs by ID for consistent output
             sorted_refs = sorted(references.values(), key=lambda x: x["id"])
-            for ref in sorted_refs:
-                report_references_section += (
-                    f"[{ref['id']}] {ref['title']} - {ref['url']}\n"
-                )
+            report_references_section = "\n\n## References\n\n" + "".join(
+                f"[{ref['id']}] {ref['title']} - {ref['url']}\n" for ref in sorted_refs
+            )
             final_report_md += report_references_section
 
         logger.info("Successfully synthesized the final report.")
@@ -1,31 +1,20 @@
-import pdb
-
-import pyperclip
 from typing import Optional, Type, Callable, Dict, Any, Union, Awaitable, TypeVar
 from pydantic import BaseModel
-from browser_use.agent.views import ActionResult
+from browser_use.agent.views import ActionModel, ActionResult
 from browser_use.browser.context import BrowserContext
-from browser_use.controller.service import Controller, DoneAction
+from browser_use.controller.service import Controller
 from browser_use.controller.registry.service import Registry, RegisteredAction
-from main_content_extractor import MainContentExtractor
-from browser_use.controller.views import (
-    ClickElementAction,
-    DoneAction,
-    ExtractPageContentAction,
-    GoToUrlAction,
-    InputTextAction,
-    OpenTabAction,
-    ScrollAction,
-    SearchGoogleAction,
-    SendKeysAction,
-    SwitchTabAction,
-)
 import logging
 import inspect
 import asyncio
+import functools
+import hashlib
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from langchain_core.language_models.chat_models import BaseChatModel
-from browser_use.agent.views import ActionModel, ActionResult
+from langchain_core.prompts import PromptTemplate
 
 from src.utils.mcp_client import create_tool_param_model, setup_mcp_client_and_tools
 
@@ -35,6 +24,158 @@ logger = logging.getLogger(__name__)
 
 Context = TypeVar('Context')
 
+# Converting a page to markdown is CPU bound and can take hundreds of ms on large pages: run it on a small
+# bounded pool so the event loop keeps serving the browser and the LLM streams in the meantime.
+_EXTRACT_POOL = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="extract_content")
+
+_EXTRACT_PROMPT = PromptTemplate(
+    input_variables=["goal", "page"],
+    template="Your task is to extract the content of the page. You will be given a page and a goal and you should "
+             "extract all relevant information around this goal from the page. If the goal is vague, summarize the "
+             "page. Respond in json format. Extraction goal: {goal}, Page: {page}",
+)
+
+
+# Agents often re-read a page that did not change: remember the last conversions, keyed on a digest of the HTML
+_MARKDOWN_CACHE_SIZE = 32
+_markdown_cache: "OrderedDict[tuple[bytes, tuple[str, ...]], str]" = OrderedDict()
+
+
+def _markdownify(html: str, strip: Optional[list[str]] = None) -> str:
+    """
+    `markdownify.markdownify` with the HTML parsed by lxml.
+    markdownify hardcodes BeautifulSoup's pure-Python html.parser, which dominates the conversion time on large
+    pages; fall back to it when lxml is not installed.
+    """
+    import markdownify
+    from bs4 import BeautifulSoup, FeatureNotFound
+
+    try:
+        soup = BeautifulSoup(html, "lxml")
+    except FeatureNotFound:
+        return markdownify.markdownify(html, strip=strip)
+    return markdownify.MarkdownConverter(strip=strip).convert_soup(soup)
+
+
+async def _html_to_markdown(html: str, strip: Optional[list[str]] = None) -> str:
+    """Convert page HTML to markdown on the extraction pool, reusing the result for HTML seen recently"""
+    key = (hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest(), tuple(strip or ()))
+    content = _markdown_cache.get(key)
+    if content is not None:
+        _markdown_cache.move_to_end(key)
+        return content
+
+    loop = asyncio.get_running_loop()
+    content = await loop.run_in_executor(_EXTRACT_POOL, functools.partial(_markdownify, html, strip=strip))
+    _markdown_cache[key] = content
+    if len(_markdown_cache) > _MARKDOWN_CACHE_SIZE:
+        _markdown_cache.popitem(last=False)
+    return content
+
+
+# Serialize the DOM inside the page without <script>/<style> elements: markdownify drops them anyway, and on
+# script-heavy pages they are most of the bytes `page.content()` would ship over CDP and parse in Python.
+# The first call also tags the document with a random id and a MutationObserver counting DOM changes; when the
+# caller already holds the HTML for the current `id:version` key, nothing is serialized at all. A navigation
+# loads a new document with a new id, and SPA updates bump the version, so a stale copy is never returned.
+_CONTENT_WITHOUT_SCRIPTS_JS = """(cachedKey) => {
+    let state = window.__webuiDomState;
+    if (!state) {
+        state = window.__webuiDomState = {id: Math.random().toString(36).slice(2), version: 0};
+        new MutationObserver(() => { state.version++; }).observe(
+            document, {subtree: true, childList: true, attributes: true, characterData: true});
+    }
+    const key = `${state.id}:${state.version}`;
+    if (key === cachedKey) {
+        return {key, html: null};
+    }
+    const root = document.documentElement.cloneNode(true);
+    root.querySelectorAll('script, style').forEach(el => el.remove());
+    return {key, html: root.outerHTML};
+}"""
+
+
+async def _frame_html(frame) -> str:
+    """
+    HTML of a page or frame without scripts and styles, or its full content if the page cannot be evaluated.
+    The last result is kept on the frame object and reused while the document did not change.
+    """
+    cached_key, cached_html = frame.__dict__.get("_webui_html_cache", (None, None))
+    try:
+        result = await frame.evaluate(_CONTENT_WITHOUT_SCRIPTS_JS, cached_key)
+    except Exception as e:
+        logger.debug(f'Falling back to the full page content: {e}')
+        return await frame.content()
+    if result["html"] is None:
+        return cached_html
+    frame.__dict__["_webui_html_cache"] = (result["key"], result["html"])
+    return result["html"]
+
+
+def _truncate(text: str, max_chars: int = 20_000, tail_chars: int = 5_000) -> str:
+    """Keep the head and the tail of an overlong text, so a raw page dump stays within a sane prompt budget"""
+    if len(text) <= max_chars:
+        return text
+    return "".join((text[:max_chars - tail_chars], "\n…[truncated]…\n", text[-tail_chars:]))
+
+
+class CustomRegistry(Registry[Context]):
+    """
+    Registry that keeps the description of the unfiltered actions and the generated action models
+    until the set of actions changes
+    """
+
+    ACTION_MODEL_CACHE_SIZE = 16
+
+    def __init__(self, exclude_actions: list[str] | None = None):
+        super().__init__(exclude_actions)
+        self._prompt_description_key = None
+        self._prompt_description = ""
+        self._action_models: "OrderedDict[tuple, type[ActionModel]]" = OrderedDict()
+
+    def _actions_key(self) -> tuple:
+        # an action re-registered under the same name (e.g. MCP tools) is a new object, hence the id
+        return tuple((name, id(action)) for name, action in self.registry.actions.items())
+
+    def create_action_model(self, include_actions: list[str] | None = None, page=None) -> type[ActionModel]:
+        """
+        Create the action model, reusing the last ones built for the same actions.
+        The agent rebuilds its models for the current page on every step, although the actions available on a page
+        almost never change. Domain filters only look at the host of the url, so that is all the key needs;
+        page filters are arbitrary callables on the page, so when one is registered the page models are not cached.
+        """
+        actions = self.registry.actions.values()
+        if page is not None and any(action.page_filter is not None for action in actions):
+            return super().create_action_model(include_actions=include_actions, page=page)
+        if page is None:
+            page_key = None
+        elif any(action.domains is not None for action in actions):
+            page_key = urlparse(page.url).netloc or page.url
+        else:
+            page_key = ""
+        key = (None if include_actions is None else tuple(include_actions), page_key, self._actions_key())
+
+        action_model = self._action_models.get(key)
+        if action_model is not None:
+            self._action_models.move_to_end(key)
+            return action_model
+        action_model = super().create_action_model(include_actions=include_actions, page=page)
+        self._action_models[key] = action_model
+        if len(self._action_models) > self.ACTION_MODEL_CACHE_SIZE:
+            self._action_models.popitem(last=False)
+        return action_model
+
+    def get_prompt_description(self, page=None) -> str:
+        if page is not None:
+            return super().get_prompt_description(page=page)
+        # describing an action dumps the JSON schema of its parameters; browser-use asks for this text at agent
+        # creation, for every planner call and on every step in raw tool calling mode
+        key = self._actions_key()
+        if key != self._prompt_description_key:
+            self._prompt_description = super().get_prompt_description()
+            self._prompt_description_key = key
+        return self._prompt_description
+
 
 class CustomController(Controller):
     def __init__(self, exclude_actions: list[str] = [],
@@ -43,6 +184,10 @@ class CustomController(Controller):
                      [str, BrowserContext], Awaitable[Dict[str, Any]]]]] = None,
                  ):
         super().__init__(exclude_actions=exclude_actions, output_model=output_model)
+        # take over the default actions registered by the base controller
+        registry = CustomRegistry[Context](exclude_actions)
+        registry.registry = self.registry.registry
+        self.registry = registry
         self._register_custom_actions()
         self.ask_assistant_callback = ask_assistant_callback
         self.mcp_client = None
@@ -70,6 +215,38 @@ class CustomController(Controller):
                 return ActionResult(extracted_content="Human cannot help you. Please try another way.",
                                     include_in_memory=True)
 
+        @self.registry.action(
+            'Extract page content to retrieve specific information from the page, e.g. all company names, a specific '
+            'description, all information about, links with companies in structured format or simply links',
+        )
+        async def extract_content(
+                goal: str, should_strip_link_urls: bool, browser: BrowserContext, page_extraction_llm: BaseChatModel
+        ):
+            # same behaviour as the browser-use action, with the HTML conversion moved off the event loop
+            page = await browser.get_current_page()
+            strip = ['a', 'img'] if should_strip_link_urls else []
+
+            parts = [await _html_to_markdown(await _frame_html(page), strip=strip)]
+
+            # manually append iframe text into the content so it's readable by the LLM (includes cross-origin iframes)
+            for iframe in page.frames:
+                if iframe.url != page.url and not iframe.url.startswith('data:'):
+                    parts.append(f'\n\nIFRAME {iframe.url}:\n')
+                    parts.append(await _html_to_markdown(await _frame_html(iframe)))
+            content = ''.join(parts)
+
+            try:
+                output = await page_extraction_llm.ainvoke(_EXTRACT_PROMPT.format(goal=goal, page=content))
+                msg = f'📄  Extracted from page\n: {output.content}\n'
+                logger.info(msg)
+                return ActionResult(extracted_content=msg, include_in_memory=True)
+            except Exception as e:
+                logger.debug(f'Error extracting content: {e}')
+                # the raw page is handed to the agent as is: keep it to a bounded head and tail
+                msg = ''.join(('📄  Extracted from page\n: ', _truncate(content), '\n'))
+                logger.info(msg)
+                return ActionResult(extracted_content=msg)
+
         @self.registry.action(
             'Upload file to interactive element with file path ',
         )
@@ -1,44 +1,24 @@
+import atexit
+import importlib.util
+
+import httpx
+import openai
 from openai import OpenAI
-import pdb
-from langchain_openai import ChatOpenAI
-from langchain_core.globals import get_llm_cache
 from langchain_core.language_models.base import (
     BaseLanguageModel,
-    LangSmithParams,
     LanguageModelInput,
 )
+import functools
 import os
-from langchain_core.load import dumpd, dumps
 from langchain_core.messages import (
     AIMessage,
     SystemMessage,
-    AnyMessage,
-    BaseMessage,
-    BaseMessageChunk,
-    HumanMessage,
-    convert_to_messages,
-    message_chunk_to_message,
-)
-from langchain_core.outputs import (
-    ChatGeneration,
-    ChatGenerationChunk,
-    ChatResult,
-    LLMResult,
-    RunInfo,
 )
-from langchain_ollama import ChatOllama
-from langchain_core.output_parsers.base import OutputParserLike
-from langchain_core.runnables import Runnable, RunnableConfig
-from langchain_core.tools import BaseTool
+from langchain_core.runnables import RunnableConfig
 
 from typing import (
-    TYPE_CHECKING,
     Any,
-    Callable,
-    Literal,
     Optional,
-    Union,
-    cast, List,
 )
 from langchain_anthropic import ChatAnthropic
 from langchain_mistralai import ChatMistralAI
@@ -47,18 +27,35 @@ from langchain_ollama import ChatOllama
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
 from langchain_ibm import ChatWatsonx
 from langchain_aws import ChatBedrock
-from pydantic import SecretStr
 
 from src.utils import config
 
 
+# One connection pool shared by every OpenAI-compatible client: TLS sessions and keep-alive connections are reused
+# across models and runs instead of each client opening its own. HTTP/2 is used when `h2` is installed.
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_http_clients: dict[str, Any] = {}
+
+
+def _shared_http_clients() -> dict[str, Any]:
+    """`http_client`/`http_async_client` kwargs for the langchain OpenAI chat models, created on first use"""
+    if not _http_clients:
+        http2 = importlib.util.find_spec("h2") is not None
+        _http_clients["http_client"] = openai.DefaultHttpxClient(http2=http2, limits=_HTTP_LIMITS)
+        _http_clients["http_async_client"] = openai.DefaultAsyncHttpxClient(http2=http2, limits=_HTTP_LIMITS)
+        # the async pool needs a running loop to close and is released with the process
+        atexit.register(_http_clients["http_client"].close)
+    return _http_clients
+
+
 class DeepSeekR1ChatOpenAI(ChatOpenAI):
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.client = OpenAI(
             base_url=kwargs.get("base_url"),
-            api_key=kwargs.get("api_key")
+            api_key=kwargs.get("api_key"),
+            http_client=kwargs.get("http_client"),
         )
 
     async def ainvoke(
@@ -78,7 +75,7 @@ class DeepSeekR1ChatOpenAI(ChatOpenAI):
             else:
                 message_history.append({"role": "user", "content": input_.content})
 
-        response = self.client.chat.completions.create(
+        response = await self.root_async_client.chat.completions.create(
             model=self.model_name,
             messages=message_history
         )
@@ -149,11 +146,32 @@ class DeepSeekR1ChatOllama(ChatOllama):
         return AIMessage(content=content, reasoning_content=reasoning_content)
 
 
+def supports_cache_control(llm: BaseLanguageModel) -> bool:
+    """
+    Whether the model's backend needs explicit `cache_control` breakpoints to cache a prompt prefix.
+    Anthropic (directly or via Bedrock) only caches marked blocks; OpenAI, Gemini and DeepSeek cache
+    matching prefixes automatically and must receive plain text.
+    Other Bedrock models (Llama, Mistral, Titan, ...) get their messages flattened to prompt text by langchain-aws,
+    so they must not receive content blocks either.
+    """
+    if isinstance(llm, ChatAnthropic):
+        return True
+    if isinstance(llm, ChatBedrock):
+        try:
+            return llm._get_provider() == "anthropic"
+        except ValueError:
+            # model ARN without an explicit provider
+            return False
+    return False
+
+
+@functools.lru_cache(maxsize=32)
 def get_llm_model(provider: str, **kwargs):
     """
     Get LLM model
+    Clients are memoized per provider and settings, so repeated runs reuse one client and its HTTP connection pool.
     :param provider: LLM provider
-    :param kwargs:
+    :param kwargs: hashable settings (model_name, temperature, base_url, api_key, ...)
     :return:
     """
     if provider not in ["ollama", "bedrock"]:
@@ -204,6 +222,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=base_url,
             api_key=api_key,
+            **_shared_http_clients(),
         )
     elif provider == "grok":
         if not kwargs.get("base_url", ""):
@@ -216,6 +235,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=base_url,
             api_key=api_key,
+            **_shared_http_clients(),
         )
     elif provider == "deepseek":
         if not kwargs.get("base_url", ""):
@@ -229,6 +249,7 @@ def get_llm_model(provider: str, **kwargs):
                 temperature=kwargs.get("temperature", 0.0),
                 base_url=base_url,
                 api_key=api_key,
+                **_shared_http_clients(),
             )
         else:
             return ChatOpenAI(
@@ -236,6 +257,7 @@ def get_llm_model(provider: str, **kwargs):
                 temperature=kwargs.get("temperature", 0.0),
                 base_url=base_url,
                 api_key=api_key,
+                **_shared_http_clients(),
             )
     elif provider == "google":
         return ChatGoogleGenerativeAI(
@@ -276,6 +298,7 @@ def get_llm_model(provider: str, **kwargs):
             api_version=api_version,
             azure_endpoint=base_url,
             api_key=api_key,
+            **_shared_http_clients(),
         )
     elif provider == "alibaba":
         if not kwargs.get("base_url", ""):
@@ -288,6 +311,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=base_url,
             api_key=api_key,
+            **_shared_http_clients(),
         )
     elif provider == "ibm":
         parameters = {
@@ -312,6 +336,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=os.getenv("MOONSHOT_ENDPOINT"),
             api_key=os.getenv("MOONSHOT_API_KEY"),
+            **_shared_http_clients(),
         )
     elif provider == "unbound":
         return ChatOpenAI(
@@ -319,6 +344,7 @@ def get_llm_model(provider: str, **kwargs):
             temperature=kwargs.get("temperature", 0.0),
             base_url=os.getenv("UNBOUND_ENDPOINT", "https://api.getunbound.ai"),
             api_key=api_key,
+            **_shared_http_clients(),
         )
     elif provider == "siliconflow":
         if not kwargs.get("api_key", ""):
@@ -334,6 +360,7 @@ def get_llm_model(provider: str, **kwargs):
             base_url=base_url,
             model_name=kwargs.get("model_name", "Qwen/QwQ-32B"),
             temperature=kwargs.get("temperature", 0.0),
+            **_shared_http_clients(),
         )
     elif provider == "modelscope":
         if not kwargs.get("api_key", ""):
@@ -349,6 +376,7 @@ def get_llm_model(provider: str, **kwargs):
             base_url=base_url,
             model_name=kwargs.get("model_name", "Qwen/QwQ-32B"),
             temperature=kwargs.get("temperature", 0.0),
+            **_shared_http_clients(),
         )
     else:
         raise ValueError(f"Unsupported provider: {provider}")
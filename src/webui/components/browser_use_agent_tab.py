@@ -6,6 +6,7 @@ import uuid
 from typing import Any, AsyncGenerator, Dict, Optional
 
 import gradio as gr
+import orjson
 
 # from browser_use.agent.service import Agent
 from browser_use.agent.views import (
@@ -102,16 +103,16 @@ def _format_agent_output(model_output: AgentOutput) -> str:
         try:
             # Directly use model_dump if actions and current_state are Pydantic models
             action_dump = [
-                action.model_dump(exclude_none=True) for action in model_output.action
+                action.model_dump(mode="json", exclude_none=True) for action in model_output.action
             ]
 
-            state_dump = model_output.current_state.model_dump(exclude_none=True)
+            state_dump = model_output.current_state.model_dump(mode="json", exclude_none=True)
             model_output_dump = {
                 "current_state": state_dump,
                 "action": action_dump,
             }
-            # Dump to JSON string with indentation
-            json_string = json.dumps(model_output_dump, indent=4, ensure_ascii=False)
+            # Dump to JSON string with indentation; orjson runs once per step and keeps non-ASCII text as is
+            json_string = orjson.dumps(model_output_dump, option=orjson.OPT_INDENT_2).decode()
             # Wrap in <pre><code> for proper display in HTML
             content = f"<pre><code class='language-json'>{json_string}</code></pre>"
 
@@ -560,6 +561,7 @@ async def run_agent_task(
         webui_manager.bu_current_task = agent_task  # Store the task
 
         last_chat_len = len(webui_manager.bu_chat_history)
+        last_screenshot_b64 = None
         while not agent_task.done():
             is_paused = webui_manager.bu_agent.state.paused
             is_stopped = webui_manager.bu_agent.state.stopped
@@ -665,18 +667,24 @@ async def run_agent_task(
                     screenshot_b64 = (
                         await webui_manager.bu_browser_context.take_screenshot()
                     )
-                    if screenshot_b64:
+                    if screenshot_b64 and screenshot_b64 == last_screenshot_b64:
+                        # page did not change since the last poll, keep the view as is
+                        pass
+                    elif screenshot_b64:
+                        last_screenshot_b64 = screenshot_b64
                         html_content = f'<img src="data:image/jpeg;base64,{screenshot_b64}" style="width:{stream_vw}vw; height:{stream_vh}vh ; border:1px solid #ccc;">'
                         update_dict[browser_view_comp] = gr.update(
                             value=html_content, visible=True
                         )
                     else:
+                        last_screenshot_b64 = None
                         html_content = f"<h1 style='width:{stream_vw}vw; height:{stream_vh}vh'>Waiting for browser session...</h1>"
                         update_dict[browser_view_comp] = gr.update(
                             value=html_content, visible=True
                         )
                 except Exception as e:
                     logger.debug(f"Failed to capture screenshot: {e}")
+                    last_screenshot_b64 = None
                     update_dict[browser_view_comp] = gr.update(
                         value="<div style='...'>Error loading view...</div>",
                         visible=True,
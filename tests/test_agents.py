@@ -1,5 +1,3 @@
-import pdb
-
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,24 +5,179 @@ import sys
 
 sys.path.append(".")
 import asyncio
+import logging
 import os
 import sys
-from pprint import pprint
+from typing import Optional
+
+import orjson
+from pydantic import BaseModel
 
 from browser_use import Agent
 from browser_use.agent.views import AgentHistoryList
 
 from src.utils import utils
 
+logger = logging.getLogger(__name__)
+
+_shared_browser = None
+
+# Every finished run is appended here as one JSON line
+HISTORY_JSONL = "./tmp/history.jsonl"
+
+# Profile reused by the test browser when BROWSER_USER_DATA is not set; delete it to start from a cold profile
+TEST_PROFILE_DIR = "./tmp/profile_cache"
+
+
+async def get_shared_browser(use_own_browser: bool = True, window_w: int = 1280, window_h: int = 1100):
+    """Launch the browser once per run; each test only opens and closes its own context"""
+    global _shared_browser
+    if _shared_browser is not None:
+        return _shared_browser
+
+    from browser_use.browser.browser import BrowserConfig
+    from browser_use.browser.context import BrowserContextConfig
+
+    from src.browser.custom_browser import CustomBrowser
+
+    extra_browser_args = []
+    if use_own_browser:
+        browser_binary_path = os.getenv("BROWSER_PATH", None)
+        if browser_binary_path == "":
+            browser_binary_path = None
+        browser_user_data = os.getenv("BROWSER_USER_DATA", None)
+        if not browser_user_data and browser_binary_path:
+            # persistent profile: cookies and HTTP/DNS caches survive between test runs
+            browser_user_data = TEST_PROFILE_DIR
+        if browser_user_data:
+            extra_browser_args += [f"--user-data-dir={browser_user_data}"]
+    else:
+        browser_binary_path = None
+    _shared_browser = CustomBrowser(
+        config=BrowserConfig(
+            headless=False,
+            browser_binary_path=browser_binary_path,
+            extra_browser_args=extra_browser_args,
+            new_context_config=BrowserContextConfig(
+                window_width=window_w,
+                window_height=window_h,
+            )
+        )
+    )
+    return _shared_browser
+
+
+async def close_shared_browser():
+    global _shared_browser
+    if _shared_browser is not None:
+        await _shared_browser.close()
+        _shared_browser = None
+
+
+def _to_json(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError
+
+
+def dump_history(task: str, history: AgentHistoryList, path: str = HISTORY_JSONL):
+    """Append the outcome of a run to a JSONL file; far cheaper than pretty-printing a long trajectory"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = {
+        "task": task,
+        "final": history.final_result(),
+        "errors": history.errors(),
+        "actions": history.model_actions(),
+        "thoughts": history.model_thoughts(),
+    }
+    with open(path, "ab") as f:
+        f.write(orjson.dumps(record, default=_to_json, option=orjson.OPT_APPEND_NEWLINE))
+
+
+async def run_with_retry(agent, max_steps: int = 100, retries: int = 3,
+                         step_timeout: float = 30) -> AgentHistoryList:
+    """
+    Run an agent, retrying with exponential backoff when the run raises; the agent keeps its browser context.
+    A run is cancelled after `step_timeout` seconds per step, so a hung page or LLM call cannot stall the whole
+    job; a timed out run is not retried.
+    """
+    for attempt in range(retries):
+        try:
+            return await asyncio.wait_for(agent.run(max_steps=max_steps), timeout=step_timeout * max_steps)
+        except asyncio.TimeoutError:
+            logger.warning(f"Agent run timed out after {step_timeout * max_steps:.0f}s")
+            raise
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            logger.warning(f"Agent run attempt {attempt + 1}/{retries} failed: {e}")
+            await asyncio.sleep(2 ** attempt)
+
+
+# (task, estimated runtime in seconds); the estimates only decide the order in which tasks are started
+PARALLEL_TASKS = [
+    ('Search Google for weather in Tokyo', 60),
+    # ('Check Reddit front page title', 45),
+    # ('Find NASA image of the day', 60),
+    # ('Check top story on CNN', 45),
+    # ('Search latest SpaceX launch date', 90),
+    # ('Look up population of Paris', 45),
+    ('Find current time in Sydney', 30),
+    ('Check who won last Super Bowl', 90),
+    # ('Search trending topics on Twitter', 120),
+]
+
+
+async def run_tasks(tasks: list[tuple[str, float]], k: int, llm, controller, use_own_browser: bool = True,
+                    window_w: int = 1280, window_h: int = 1100) -> list[Optional[AgentHistoryList]]:
+    """
+    Run tasks on at most `k` concurrent agents over the shared browser, each agent in a context of its own.
+    Tasks are started longest-first (LPT), so the slow ones do not end up alone at the tail of the run.
+    Returns the histories in the order of `tasks`, None for a task that raised.
+    """
+    from browser_use.browser.context import BrowserContextConfig
+
+    from src.agent.browser_use.browser_use_agent import BrowserUseAgent
+
+    browser = await get_shared_browser(use_own_browser, window_w, window_h)
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in sorted(range(len(tasks)), key=lambda i: tasks[i][1], reverse=True):
+        queue.put_nowait(i)
+    histories: list[Optional[AgentHistoryList]] = [None] * len(tasks)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            task = tasks[i][0]
+            browser_context = await browser.new_context(
+                config=BrowserContextConfig(
+                    save_downloads_path="./tmp/downloads",
+                    window_height=window_h,
+                    window_width=window_w,
+                    force_new_context=True,
+                )
+            )
+            try:
+                agent = BrowserUseAgent(task=task, llm=llm, browser=browser, browser_context=browser_context,
+                                        controller=controller)
+                histories[i] = await run_with_retry(agent)
+            except Exception:
+                import traceback
+
+                traceback.print_exc()
+            finally:
+                await browser_context.close()
+
+    await asyncio.gather(*(worker() for _ in range(min(k, len(tasks)))))
+    return histories
+
 
 async def test_browser_use_agent():
-    from browser_use.browser.browser import Browser, BrowserConfig
     from browser_use.browser.context import (
         BrowserContextConfig
     )
     from browser_use.agent.service import Agent
 
-    from src.browser.custom_browser import CustomBrowser
     from src.controller.custom_controller import CustomController
     from src.utils import llm_provider
     from src.agent.browser_use.browser_use_agent import BrowserUseAgent
@@ -102,27 +255,7 @@ async def test_browser_use_agent():
     browser_context = None
 
     try:
-        extra_browser_args = []
-        if use_own_browser:
-            browser_binary_path = os.getenv("BROWSER_PATH", None)
-            if browser_binary_path == "":
-                browser_binary_path = None
-            browser_user_data = os.getenv("BROWSER_USER_DATA", None)
-            if browser_user_data:
-                extra_browser_args += [f"--user-data-dir={browser_user_data}"]
-        else:
-            browser_binary_path = None
-        browser = CustomBrowser(
-            config=BrowserConfig(
-                headless=False,
-                browser_binary_path=browser_binary_path,
-                extra_browser_args=extra_browser_args,
-                new_context_config=BrowserContextConfig(
-                    window_width=window_w,
-                    window_height=window_h,
-                )
-            )
-        )
+        browser = await get_shared_browser(use_own_browser, window_w, window_h)
         browser_context = await browser.new_context(
             config=BrowserContextConfig(
                 trace_path=None,
@@ -143,13 +276,11 @@ async def test_browser_use_agent():
             max_actions_per_step=max_actions_per_step,
             generate_gif=True
         )
-        history: AgentHistoryList = await agent.run(max_steps=100)
-
-        print("Final Result:")
-        pprint(history.final_result(), indent=4)
+        history: AgentHistoryList = await run_with_retry(agent, max_steps=100)
 
-        print("\nErrors:")
-        pprint(history.errors(), indent=4)
+        print(f"Final Result: {history.final_result()}")
+        dump_history(agent.task, history)
+        print(f"History appended to {HISTORY_JSONL}")
 
     except Exception:
         import traceback
@@ -157,23 +288,13 @@ async def test_browser_use_agent():
     finally:
         if browser_context:
             await browser_context.close()
-        if browser:
-            await browser.close()
         if controller:
             await controller.close_mcp_client()
 
 
 async def test_browser_use_parallel():
-    from browser_use.browser.browser import Browser, BrowserConfig
-    from browser_use.browser.context import (
-        BrowserContextConfig,
-    )
-    from browser_use.agent.service import Agent
-
-    from src.browser.custom_browser import CustomBrowser
     from src.controller.custom_controller import CustomController
     from src.utils import llm_provider
-    from src.agent.browser_use.browser_use_agent import BrowserUseAgent
 
     # llm = utils.get_llm_model(
     #     provider="openai",
@@ -251,81 +372,54 @@ async def test_browser_use_parallel():
     controller = CustomController()
     await controller.setup_mcp_client(mcp_server_config)
     use_own_browser = True
-    use_vision = True  # Set to False when using DeepSeek
-
-    max_actions_per_step = 10
-    browser = None
-    browser_context = None
 
     try:
-        extra_browser_args = []
-        if use_own_browser:
-            browser_binary_path = os.getenv("BROWSER_PATH", None)
-            if browser_binary_path == "":
-                browser_binary_path = None
-            browser_user_data = os.getenv("BROWSER_USER_DATA", None)
-            if browser_user_data:
-                extra_browser_args += [f"--user-data-dir={browser_user_data}"]
-        else:
-            browser_binary_path = None
-        browser = CustomBrowser(
-            config=BrowserConfig(
-                headless=False,
-                browser_binary_path=browser_binary_path,
-                extra_browser_args=extra_browser_args,
-                new_context_config=BrowserContextConfig(
-                    window_width=window_w,
-                    window_height=window_h,
-                )
-            )
-        )
-        browser_context = await browser.new_context(
-            config=BrowserContextConfig(
-                trace_path=None,
-                save_recording_path=None,
-                save_downloads_path="./tmp/downloads",
-                window_height=window_h,
-                window_width=window_w,
-                force_new_context=True
-            )
-        )
-        agents = [
-            BrowserUseAgent(task=task, llm=llm, browser=browser, controller=controller)
-            for task in [
-                'Search Google for weather in Tokyo',
-                # 'Check Reddit front page title',
-                # 'Find NASA image of the day',
-                # 'Check top story on CNN',
-                # 'Search latest SpaceX launch date',
-                # 'Look up population of Paris',
-                'Find current time in Sydney',
-                'Check who won last Super Bowl',
-                # 'Search trending topics on Twitter',
-            ]
-        ]
-
-        history = await asyncio.gather(*[agent.run() for agent in agents])
-        print("Final Result:")
-        pprint(history.final_result(), indent=4)
-
-        print("\nErrors:")
-        pprint(history.errors(), indent=4)
-
-        pdb.set_trace()
+        histories = await run_tasks(PARALLEL_TASKS, k=5, llm=llm, controller=controller,
+                                    use_own_browser=use_own_browser, window_w=window_w, window_h=window_h)
+        for (task, _), history in zip(PARALLEL_TASKS, histories):
+            print(f"\nTask: {task}")
+            if history is None:
+                print("Failed, see traceback above")
+                continue
+            print(f"Final Result: {history.final_result()}")
+            dump_history(task, history)
+        print(f"\nHistories appended to {HISTORY_JSONL}")
+
+        if os.getenv("DEBUG_LLM"):
+            breakpoint()
 
     except Exception:
         import traceback
 
         traceback.print_exc()
     finally:
-        if browser_context:
-            await browser_context.close()
-        if browser:
-            await browser.close()
         if controller:
             await controller.close_mcp_client()
 
 
+def test_deep_research_browser_task_setup_failure():
+    """A browser that fails to start gives a failed result instead of an UnboundLocalError from the cleanup"""
+    import threading
+
+    from src.agent.deep_research import deep_research_agent
+
+    class FailingBrowser:
+        def __init__(self, *args, **kwargs):
+            raise RuntimeError("browser failed to start")
+
+    original_browser = deep_research_agent.CustomBrowser
+    deep_research_agent.CustomBrowser = FailingBrowser
+    try:
+        result = asyncio.run(deep_research_agent.run_single_browser_task(
+            "nvidia stock price", "test-task", llm=None, browser_config={}, stop_event=threading.Event()
+        ))
+    finally:
+        deep_research_agent.CustomBrowser = original_browser
+
+    assert result == {"query": "nvidia stock price", "error": "browser failed to start", "status": "failed"}
+    assert not deep_research_agent._BROWSER_AGENT_INSTANCES
+
+
 async def test_deep_research_agent():
     from src.agent.deep_research.deep_research_agent import DeepResearchAgent, PLAN_FILENAME, REPORT_FILENAME
     from src.utils import llm_provider
@@ -394,7 +488,21 @@ async def test_deep_research_agent():
         print(e)
 
 
+async def main():
+    try:
+        await test_browser_use_agent()
+        # await test_browser_use_parallel()
+        # await test_deep_research_agent()
+    finally:
+        await close_shared_browser()
+
+
 if __name__ == "__main__":
-    asyncio.run(test_browser_use_agent())
-    # asyncio.run(test_browser_use_parallel())
-    # asyncio.run(test_deep_research_agent())
+    try:
+        # optional libuv-based event loop, faster on the socket-bound LLM and CDP traffic
+        import uvloop
+
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+    run(main())
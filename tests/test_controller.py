@@ -1,5 +1,5 @@
 import asyncio
-import pdb
+import os
 import sys
 import time
 
@@ -49,7 +49,8 @@ async def test_mcp_client():
         print(tool.name)
         print(tool.description)
         print(tool_param_model.model_json_schema())
-    pdb.set_trace()
+    if os.getenv("DEBUG_LLM"):
+        breakpoint()
 
 
 async def test_controller_with_mcp():
@@ -117,13 +118,16 @@ async def test_controller_with_mcp():
             result = await controller.act(action_model)
             result = result.extracted_content
             if result:
-                pdb.set_trace()
+                if os.getenv("DEBUG_LLM"):
+                    breakpoint()
                 output_result = result
                 break
         print(output_result)
-        pdb.set_trace()
+        if os.getenv("DEBUG_LLM"):
+            breakpoint()
     await controller.close_mcp_client()
-    pdb.set_trace()
+    if os.getenv("DEBUG_LLM"):
+        breakpoint()
 
 
 if __name__ == '__main__':
@@ -1,6 +1,7 @@
+import asyncio
 import os
-import pdb
 from dataclasses import dataclass
+from functools import lru_cache
 
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -22,12 +23,18 @@ class LLMConfig:
     api_key: str = None
 
 
+@lru_cache(maxsize=8)
+def encode_test_image(image_path):
+    """Read and base64-encode a test image once; the vision tests all send the same file."""
+    from src.utils import utils
+    return utils.encode_image(image_path)
+
+
 def create_message_content(text, image_path=None):
     content = [{"type": "text", "text": text}]
     image_format = "png" if image_path and image_path.endswith(".png") else "jpeg"
     if image_path:
-        from src.utils import utils
-        image_data = utils.encode_image(image_path)
+        image_data = encode_test_image(image_path)
         content.append({
             "type": "image_url",
             "image_url": {"url": f"data:image/{image_format};base64,{image_data}"}
@@ -52,7 +59,16 @@ def get_env_value(key, provider):
     return ""
 
 
-def test_llm(config, query, image_path=None, system_message=None):
+# The smoke tests are pure network I/O: run them concurrently, with at most this many requests in flight
+_LLM_SEMAPHORE = asyncio.Semaphore(6)
+
+
+async def test_llm(config, query, image_path=None, system_message=None):
+    async with _LLM_SEMAPHORE:
+        await _test_llm(config, query, image_path, system_message)
+
+
+async def _test_llm(config, query, image_path=None, system_message=None):
     from src.utils import utils, llm_provider
 
     # Special handling for Ollama-based models
@@ -63,10 +79,11 @@ def test_llm(config, query, image_path=None, system_message=None):
         else:
             llm = ChatOllama(model=config.model_name)
 
-        ai_msg = llm.invoke(query)
+        ai_msg = await llm.ainvoke(query)
         print(ai_msg.content)
         if "deepseek-r1" in config.model_name:
-            pdb.set_trace()
+            if os.getenv("DEBUG_LLM"):
+                breakpoint()
         return
 
     # For other providers, use the standard configuration
@@ -83,77 +100,90 @@ def test_llm(config, query, image_path=None, system_message=None):
     if system_message:
         messages.append(SystemMessage(content=create_message_content(system_message)))
     messages.append(HumanMessage(content=create_message_content(query, image_path)))
-    ai_msg = llm.invoke(messages)
+    ai_msg = await llm.ainvoke(messages)
 
     # Handle different response types
     if hasattr(ai_msg, "reasoning_content"):
         print(ai_msg.reasoning_content)
     print(ai_msg.content)
 
-def test_openai_model():
+async def test_openai_model():
     config = LLMConfig(provider="openai", model_name="gpt-4o")
-    test_llm(config, "Describe this image", "assets/examples/test.png")
+    await test_llm(config, "Describe this image", "assets/examples/test.png")
 
 
-def test_google_model():
+async def test_google_model():
     # Enable your API key first if you haven't: https://ai.google.dev/palm_docs/oauth_quickstart
     config = LLMConfig(provider="google", model_name="gemini-2.0-flash-exp")
-    test_llm(config, "Describe this image", "assets/examples/test.png")
+    await test_llm(config, "Describe this image", "assets/examples/test.png")
 
 
-def test_azure_openai_model():
+async def test_azure_openai_model():
     config = LLMConfig(provider="azure_openai", model_name="gpt-4o")
-    test_llm(config, "Describe this image", "assets/examples/test.png")
+    await test_llm(config, "Describe this image", "assets/examples/test.png")
 
 
-def test_deepseek_model():
+async def test_deepseek_model():
     config = LLMConfig(provider="deepseek", model_name="deepseek-chat")
-    test_llm(config, "Who are you?")
+    await test_llm(config, "Who are you?")
 
 
-def test_deepseek_r1_model():
+async def test_deepseek_r1_model():
     config = LLMConfig(provider="deepseek", model_name="deepseek-reasoner")
-    test_llm(config, "Which is greater, 9.11 or 9.8?", system_message="You are a helpful AI assistant.")
+    await test_llm(config, "Which is greater, 9.11 or 9.8?", system_message="You are a helpful AI assistant.")
 
 
-def test_ollama_model():
+async def test_ollama_model():
     config = LLMConfig(provider="ollama", model_name="qwen2.5:7b")
-    test_llm(config, "Sing a ballad of LangChain.")
+    await test_llm(config, "Sing a ballad of LangChain.")
 
 
-def test_deepseek_r1_ollama_model():
+async def test_deepseek_r1_ollama_model():
     config = LLMConfig(provider="ollama", model_name="deepseek-r1:14b")
-    test_llm(config, "How many 'r's are in the word 'strawberry'?")
+    await test_llm(config, "How many 'r's are in the word 'strawberry'?")
 
 
-def test_mistral_model():
+async def test_mistral_model():
     config = LLMConfig(provider="mistral", model_name="pixtral-large-latest")
-    test_llm(config, "Describe this image", "assets/examples/test.png")
+    await test_llm(config, "Describe this image", "assets/examples/test.png")
 
 
-def test_moonshot_model():
+async def test_moonshot_model():
     config = LLMConfig(provider="moonshot", model_name="moonshot-v1-32k-vision-preview")
-    test_llm(config, "Describe this image", "assets/examples/test.png")
+    await test_llm(config, "Describe this image", "assets/examples/test.png")
 
 
-def test_ibm_model():
+async def test_ibm_model():
     config = LLMConfig(provider="ibm", model_name="meta-llama/llama-4-maverick-17b-128e-instruct-fp8")
-    test_llm(config, "Describe this image", "assets/examples/test.png")
+    await test_llm(config, "Describe this image", "assets/examples/test.png")
 
 
-def test_qwen_model():
+async def test_qwen_model():
     config = LLMConfig(provider="alibaba", model_name="qwen-vl-max")
-    test_llm(config, "How many 'r's are in the word 'strawberry'?")
+    await test_llm(config, "How many 'r's are in the word 'strawberry'?")
+
+
+async def main():
+    await asyncio.gather(
+        # test_openai_model(),
+        # test_google_model(),
+        test_azure_openai_model(),
+        # test_deepseek_model(),
+        # test_ollama_model(),
+        # test_deepseek_r1_model(),
+        # test_deepseek_r1_ollama_model(),
+        # test_mistral_model(),
+        # test_ibm_model(),
+        # test_qwen_model(),
+    )
 
 
 if __name__ == "__main__":
-    # test_openai_model()
-    # test_google_model()
-    test_azure_openai_model()
-    # test_deepseek_model()
-    # test_ollama_model()
-    # test_deepseek_r1_model()
-    # test_deepseek_r1_ollama_model()
-    # test_mistral_model()
-    # test_ibm_model()
-    # test_qwen_model()
+    try:
+        # optional libuv-based event loop, faster on the socket-bound LLM and CDP traffic
+        import uvloop
+
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+    run(main())
@@ -1,4 +1,3 @@
-import pdb
 from dotenv import load_dotenv
 
 load_dotenv()